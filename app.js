@@ -1,8 +1,10 @@
 // ZOE Sleep Assessment Application
 class ZOEApp {
     constructor() {
-        this.scheduleData = null;
-        this.questionsData = null;
+        this.manifest = null;
+        this.dayCache = {};
+        this.moduleCache = {};
+        this.totalDays = 14;
         this.currentDay = 1;
         this.currentQuestionIndex = 0;
         this.todayQuestions = [];
@@ -11,26 +13,68 @@ class ZOEApp {
         this.expansionsTriggered = [];
         this.dayStartTime = null;
         
-        this.loadData();
+        this.ready = null;
+        this.loadManifest().catch(error => console.error('Error loading data:', error));
         this.loadProgress();
     }
 
     async loadData() {
-        try {
-            // Load schedule
-            const scheduleResponse = await fetch('data/14day_schedule.json');
-            const scheduleJson = await scheduleResponse.json();
-            this.scheduleData = scheduleJson.schedule;
-            
-            // Load questions
-            const questionsResponse = await fetch('data/questions.json');
-            this.questionsData = await questionsResponse.json();
-            
-            console.log('Data loaded successfully');
-        } catch (error) {
-            console.error('Error loading data:', error);
-            alert('Error loading questionnaire data. Please refresh the page.');
+        // Load the bundle manifest; day and module shards are fetched on demand
+        const manifestResponse = await fetch('data/bundles/manifest.json', { cache: 'no-cache' });
+        if (!manifestResponse.ok) {
+            throw new Error(`Manifest request failed with status ${manifestResponse.status}`);
+        }
+        this.manifest = await manifestResponse.json();
+        this.totalDays = this.manifest.total_days;
+        
+        console.log('Data loaded successfully');
+    }
+
+    loadManifest() {
+        // A failed load is forgotten so the next call retries it
+        if (!this.ready) {
+            this.ready = this.loadData().catch(error => {
+                this.ready = null;
+                throw error;
+            });
+        }
+        return this.ready;
+    }
+
+    async fetchShard(entry) {
+        // Shard names are content hashes, so the browser cache can keep them forever
+        const response = await fetch(`data/bundles/${entry.file}`);
+        if (!response.ok) {
+            throw new Error(`Shard ${entry.file} request failed with status ${response.status}`);
+        }
+        return response.json();
+    }
+
+    cachedShard(cache, key, entry) {
+        if (!cache[key]) {
+            // Evict failures so a transient error doesn't stick until reload
+            cache[key] = this.fetchShard(entry).catch(error => {
+                delete cache[key];
+                throw error;
+            });
         }
+        return cache[key];
+    }
+
+    loadDay(day) {
+        const entry = this.manifest.days[day.toString()];
+        if (!entry) {
+            return Promise.reject(new Error(`Day ${day} is missing from the bundle manifest`));
+        }
+        return this.cachedShard(this.dayCache, day, entry);
+    }
+
+    loadModule(name) {
+        const entry = this.manifest.modules[name];
+        if (!entry) {
+            return Promise.resolve({ module: name, question_count: 0, questions: [] });
+        }
+        return this.cachedShard(this.moduleCache, name, entry);
     }
 
     loadProgress() {
@@ -77,13 +121,41 @@ class ZOEApp {
         document.getElementById(screenId).classList.add('active');
     }
 
-    showDayScreen() {
-        const dayData = this.scheduleData[this.currentDay.toString()];
-        if (!dayData) {
-            this.showComplete();
+    async showDayScreen() {
+        let dayData;
+        let triggered;
+        try {
+            await this.loadManifest();
+            if (this.currentDay > this.totalDays) {
+                this.showFinalResults();
+                return;
+            }
+            dayData = await this.loadDay(this.currentDay);
+
+            // Check for expansions from previous responses, fetching only the triggered module shards
+            const expansions = (dayData.possible_expansions || []).filter(expansion => {
+                const response = this.userResponses[expansion.trigger_question_id];
+                return response && this.checkTrigger(response.response, expansion.condition);
+            });
+            triggered = await Promise.all(expansions.map(async expansion => ({
+                expansion,
+                modules: await Promise.all(
+                    expansion.expansion_modules.map(module => this.loadModule(module.module))
+                )
+            })));
+        } catch (error) {
+            // A network or bundle error is not the end of the journey; progress stays saved
+            console.error('Error loading day:', error);
+            alert('Error loading questionnaire data. Please check your connection and refresh the page.');
             return;
         }
 
+        // Prefetch tomorrow's shard while the user answers today's questions;
+        // a failed prefetch is evicted and simply fetched again tomorrow
+        if (this.currentDay < this.totalDays) {
+            this.loadDay(this.currentDay + 1).catch(error => console.warn('Prefetch failed:', error));
+        }
+
         // Show progress bar
         document.getElementById('progressContainer').style.display = 'block';
         this.updateProgress();
@@ -91,28 +163,20 @@ class ZOEApp {
         // Prepare today's questions
         this.todayQuestions = [...dayData.core_questions];
         
-        // Check for expansions from previous responses
-        if (dayData.possible_expansions && dayData.possible_expansions.length > 0) {
-            dayData.possible_expansions.forEach(expansion => {
-                const triggerQ = expansion.trigger_question;
-                const response = this.userResponses[triggerQ.id];
-                
-                if (response && this.checkTrigger(response.response, expansion.condition)) {
-                    // Add expansion questions
-                    expansion.expansion_modules.forEach(module => {
-                        this.todayQuestions.push(...module.questions);
-                    });
-                    
-                    // Show expansion alert
-                    this.showExpansionAlert(expansion);
-                    
-                    // Track expansion
-                    this.expansionsTriggered.push({
-                        day: this.currentDay,
-                        modules: expansion.expansion_modules.map(m => m.module),
-                        questionCount: expansion.total_additional_questions
-                    });
-                }
+        for (const { expansion, modules } of triggered) {
+            // Add expansion questions
+            modules.forEach(module => {
+                this.todayQuestions.push(...module.questions);
+            });
+            
+            // Show expansion alert
+            this.showExpansionAlert(expansion);
+            
+            // Track expansion
+            this.expansionsTriggered.push({
+                day: this.currentDay,
+                modules: expansion.expansion_modules.map(m => m.module),
+                questionCount: expansion.total_additional_questions
             });
         }
 
@@ -350,7 +414,6 @@ class ZOEApp {
     }
 
     completeDayScreen() {
-        const dayData = this.scheduleData[this.currentDay.toString()];
         const timeSpent = Math.round((new Date() - this.dayStartTime) / 60000); // minutes
 
         // Update completion screen
@@ -374,7 +437,7 @@ class ZOEApp {
 
         // Update next day button
         const nextDayBtn = document.getElementById('nextDayBtn');
-        if (this.currentDay >= 14) {
+        if (this.currentDay >= this.totalDays) {
             nextDayBtn.textContent = 'View Final Results';
         } else {
             nextDayBtn.textContent = 'Continue to Next Day';
@@ -387,7 +450,7 @@ class ZOEApp {
         const container = document.getElementById('daySummary');
         let html = '';
         
-        for (let day = 1; day <= 14; day++) {
+        for (let day = 1; day <= this.totalDays; day++) {
             let className = 'day-badge';
             if (day < this.currentDay) {
                 className += ' completed';
@@ -401,7 +464,7 @@ class ZOEApp {
     }
 
     continueToNextDay() {
-        if (this.currentDay >= 14) {
+        if (this.currentDay >= this.totalDays) {
             this.showFinalResults();
             return;
         }
@@ -430,12 +493,12 @@ class ZOEApp {
     }
 
     showFinalResults() {
-        alert('Congratulations! You\'ve completed the 14-day ZOE Sleep Assessment. Your responses have been saved.');
+        alert(`Congratulations! You've completed the ${this.totalDays}-day ZOE Sleep Assessment. Your responses have been saved.`);
         this.viewResults();
     }
 
     updateProgress() {
-        const totalDays = 14;
+        const totalDays = this.totalDays;
         const progress = ((this.currentDay - 1) / totalDays) * 100;
         
         document.getElementById('progressFill').style.width = `${progress}%`;
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+ZOE Adaptive Onboarding - Static Client Bundles
+Splits a generated schedule into one content-addressed, gzip-precompressed
+file per day and per expansion module, plus a manifest of hashes and ETags,
+so app.js only fetches the current day (and the modules it triggers).
+"""
+
+import gzip
+import hashlib
+import json
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any
+
+# Superseded shards stay on disk this long, so sessions still holding an
+# older manifest can finish loading their days and modules
+RETENTION_DAYS = 7
+
+
+class ScheduleBundler:
+    def __init__(self, schedule: Dict[str, Any]):
+        """schedule: output of QuestionDistributor.generate_schedule"""
+        self.total_days = schedule['total_days']
+        self.schedule = schedule['schedule']
+
+    @classmethod
+    def from_file(cls, schedule_file: str) -> 'ScheduleBundler':
+        with open(schedule_file, 'r') as f:
+            return cls(json.load(f))
+
+    def split(self):
+        """Split the schedule into per-day and per-module shard contents"""
+
+        days = {}
+        modules = {}
+
+        for day_num, day_info in self.schedule.items():
+            day_shard = {k: v for k, v in day_info.items() if k != 'possible_expansions'}
+            day_shard['possible_expansions'] = []
+
+            for expansion in day_info.get('possible_expansions', []):
+                # Days reference modules by name only, so a module edit
+                # re-hashes the module shard and the manifest, not the days
+                for module_info in expansion['expansion_modules']:
+                    modules[module_info['module']] = {
+                        'module': module_info['module'],
+                        'question_count': module_info['question_count'],
+                        'questions': module_info['questions']
+                    }
+
+                day_shard['possible_expansions'].append({
+                    'trigger_question_id': expansion['trigger_question']['id'],
+                    'condition': expansion['condition'],
+                    'expansion_modules': [
+                        {'module': m['module'], 'question_count': m['question_count']}
+                        for m in expansion['expansion_modules']
+                    ],
+                    'total_additional_questions': expansion['total_additional_questions'],
+                    'estimated_additional_minutes': expansion['estimated_additional_minutes']
+                })
+
+            days[str(day_num)] = day_shard
+
+        return days, modules
+
+    def _write_shard(self, output_path: Path, prefix: str, content: Any) -> Dict[str, Any]:
+        """Write one content-addressed shard and its .gz; returns its manifest entry"""
+
+        data = json.dumps(content, ensure_ascii=False, sort_keys=True,
+                          separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        file_name = f'{prefix}.{digest[:16]}.json'
+
+        # mtime=0 keeps the compressed bytes reproducible across builds
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+
+        (output_path / file_name).write_bytes(data)
+        (output_path / f'{file_name}.gz').write_bytes(compressed)
+
+        return {
+            'file': file_name,
+            'sha256': digest,
+            'etag': f'"{digest[:32]}"',
+            'bytes': len(data),
+            'gzip_bytes': len(compressed)
+        }
+
+    def _retire_stale(self, output_path: Path, current: set, retention_days: int) -> Dict[str, str]:
+        """
+        Track shards no longer in the manifest under 'retired' (file -> time
+        it was superseded) and delete them once retention_days have passed.
+        """
+
+        retired = {}
+        manifest_file = output_path / 'manifest.json'
+        if manifest_file.exists():
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                retired = json.load(f).get('retired', {})
+
+        now = datetime.now()
+        cutoff = now - timedelta(days=retention_days)
+        kept = {}
+
+        for stale in sorted(output_path.glob('day-*.json')) + sorted(output_path.glob('module-*.json')):
+            if stale.name in current:
+                continue
+
+            retired_at = retired.get(stale.name, now.isoformat(timespec='seconds'))
+            if datetime.fromisoformat(retired_at) > cutoff:
+                kept[stale.name] = retired_at
+                continue
+
+            stale.unlink()
+            gzipped = output_path / f'{stale.name}.gz'
+            if gzipped.exists():
+                gzipped.unlink()
+
+        return kept
+
+    def write(self, output_dir: str, retention_days: int = RETENTION_DAYS) -> Dict[str, Any]:
+        """Write all shards and manifest.json, expiring shards from older builds"""
+
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+
+        days, modules = self.split()
+
+        manifest = {
+            'total_days': self.total_days,
+            'days': {day: self._write_shard(output_path, f'day-{day}', shard)
+                     for day, shard in sorted(days.items(), key=lambda item: int(item[0]))},
+            'modules': {name: self._write_shard(output_path, 'module-' + name.lower().replace(' ', '-'), shard)
+                        for name, shard in sorted(modules.items())}
+        }
+
+        current = {entry['file'] for group in ('days', 'modules') for entry in manifest[group].values()}
+        manifest['retired'] = self._retire_stale(output_path, current, retention_days)
+
+        # Clients always revalidate the manifest; shards are immutable
+        with open(output_path / 'manifest.json', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+        total_bytes = sum(e['bytes'] for group in ('days', 'modules') for e in manifest[group].values())
+        total_gzip = sum(e['gzip_bytes'] for group in ('days', 'modules') for e in manifest[group].values())
+
+        print(f"📦 Wrote {len(days)} day shards and {len(modules)} module shards to {output_path}")
+        print(f"   Total: {total_bytes:,} bytes ({total_gzip:,} gzipped)")
+        if manifest['retired']:
+            print(f"   Keeping {len(manifest['retired'])} superseded shards for up to {retention_days} days")
+        first_day = manifest['days'].get('1')
+        if first_day:
+            print(f"   Day 1 first load: {first_day['bytes']:,} bytes ({first_day['gzip_bytes']:,} gzipped)")
+
+        return manifest
+
+
+if __name__ == '__main__':
+    schedule_file = sys.argv[1] if len(sys.argv) > 1 else '/Users/martinkawalski/ZOE/data/14day_schedule.json'
+    output_dir = str(Path(schedule_file).parent / 'bundles')
+
+    ScheduleBundler.from_file(schedule_file).write(output_dir)
@@ -2,13 +2,32 @@
 """
 ZOE Adaptive Onboarding - 14-Day Question Distribution Algorithm
 Distributes questions intelligently across 14 days with adaptive expansion logic.
+Batch mode builds 7/14/21-day and per-cohort variants from a variant spec file.
 """
 
 import json
+import math
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from collections import defaultdict
 
+from build_bundles import ScheduleBundler
+
+# Gateway days in their default order (days 4-6 of the 14-day schedule)
+DEFAULT_SECTION_ORDER = ['INSOMNIA', 'DAYTIME', 'APNEA']
+
+# Days 1-3 (profile + sleep quality) and the gateway days are fixed
+FIXED_DAYS = 3 + len(DEFAULT_SECTION_ORDER)
+
+# Pacing target; shorter schedules exceed it on the remaining days
+TARGET_MAX_QUESTIONS_PER_DAY = 4
+
+# Rules spell some instruments out in full; their questionnaire sheets use the abbreviation
+MODULE_ALIASES = {'Pre-Sleep Arousal Scale': 'PSAS'}
+
+
 class QuestionDistributor:
     def __init__(self, questions_file: str, rules_file: str):
         with open(questions_file, 'r') as f:
@@ -23,19 +42,49 @@ class QuestionDistributor:
         for q in self.questions:
             if q['module'] != 'CORE':
                 self.expansion_questions_by_module[q['module']].append(q)
+        
+        # Map trigger questions to expansion modules once; shared by all variants
+        self.trigger_map = {}
+        for rule in self.conditional_rules:
+            self.trigger_map[rule['trigger_question_id']] = {
+                'condition': rule['condition'],
+                'modules': [MODULE_ALIASES.get(m, m) for m in rule['expanded_modules']],
+                'rule_text': rule['rule_text']
+            }
+        self.rule_modules = {m for trigger in self.trigger_map.values() for m in trigger['modules']}
+        
+        # (trigger question id, allowed modules) -> expansion module details
+        self._expansion_cache = {}
     
     def distribute_14_days(self) -> Dict[int, Any]:
+        """Distribute core questions across the default 14 days."""
+        return self.distribute_days(14)
+    
+    def distribute_days(self, num_days: int = 14,
+                        section_order: Optional[List[str]] = None) -> Dict[int, Any]:
         """
-        Distribute core questions across 14 days with intelligent pacing.
+        Distribute core questions across num_days with intelligent pacing.
         Strategy:
         - Days 1-3: Demographics + Initial screening (gateway questions)
-        - Days 4-7: Sleep quality and quantity assessment
-        - Days 8-10: Circadian rhythm and chronotype
-        - Days 11-14: Lifestyle, environment, and wrap-up
+        - Days 4-6: Insomnia, daytime function and apnea gateways
+          (reordered by section_order)
+        - Remaining days: Circadian rhythm, lifestyle, environment, and wrap-up
         - Target: 2-4 core questions per day
+        
+        Remaining questions are spread evenly, and every remaining day gets
+        at least one, so num_days can't exceed FIXED_DAYS + the remaining
+        core questions. Schedules too short for the target compress days
+        1-6 (fewer profile days, gateways sharing a day) rather than piling
+        questions onto the last day.
         """
         
-        daily_schedule = {}
+        if num_days < 3:
+            raise ValueError(f"Schedule needs at least 3 days, got {num_days}")
+        
+        section_order = [s.upper() for s in (section_order or DEFAULT_SECTION_ORDER)]
+        if sorted(section_order) != sorted(DEFAULT_SECTION_ORDER):
+            raise ValueError(f"section_order must be a permutation of {DEFAULT_SECTION_ORDER}, "
+                             f"got {section_order}")
         
         # Group questions by section/theme
         demographics = [q for q in self.core_questions if q['section'] and 'DEMO' in q['section'].upper()]
@@ -48,73 +97,90 @@ class QuestionDistributor:
         other_core = [q for q in self.core_questions 
                      if q not in demographics + sleep_quality + insomnia_screen + daytime_function + apnea_screen]
         
-        # Day 1-2: Welcome + Demographics
-        daily_schedule[1] = {
-            'day': 1,
-            'title': 'Welcome to ZOE',
-            'description': 'Let\'s start with some basic information about you.',
-            'core_questions': demographics[:3],
-            'estimated_minutes': 2,
-            'can_trigger_expansion': False
-        }
+        max_days = FIXED_DAYS + len(other_core)
+        if num_days > max_days:
+            raise ValueError(f"Only {len(other_core)} core questions remain after day {FIXED_DAYS}, "
+                             f"so a schedule can span at most {max_days} days, got {num_days}")
         
-        daily_schedule[2] = {
-            'day': 2,
-            'title': 'Basic Profile',
-            'description': 'A few more details to personalize your assessment.',
-            'core_questions': demographics[3:] + sleep_quality[:1],
-            'estimated_minutes': 2,
-            'can_trigger_expansion': False
+        gateway_days = {
+            'INSOMNIA': {
+                'title': 'Sleep Difficulties',
+                'description': 'Understanding your sleep patterns.',
+                'core_questions': insomnia_screen,
+                'estimated_minutes': 3,
+                'can_trigger_expansion': True,
+                'trigger_note': 'If you report sleep difficulties, we\'ll ask some additional questions to better understand your situation.'
+            },
+            'DAYTIME': {
+                'title': 'Daytime Energy',
+                'description': 'How do you feel during the day?',
+                'core_questions': daytime_function,
+                'estimated_minutes': 3,
+                'can_trigger_expansion': True,
+                'trigger_note': 'Excessive daytime sleepiness may require deeper assessment.'
+            },
+            'APNEA': {
+                'title': 'Breathing & Sleep',
+                'description': 'Checking for breathing-related sleep issues.',
+                'core_questions': apnea_screen,
+                'estimated_minutes': 3,
+                'can_trigger_expansion': True,
+                'trigger_note': 'Snoring or breathing pauses during sleep are important indicators.'
+            }
         }
         
-        # Day 3: Initial Sleep Quality Screening
-        daily_schedule[3] = {
-            'day': 3,
-            'title': 'Sleep Quality Check',
-            'description': 'How has your sleep been lately?',
-            'core_questions': sleep_quality[1:],
-            'estimated_minutes': 2,
-            'can_trigger_expansion': False
-        }
+        profile_questions = demographics + sleep_quality
+        profile_days, gateway_groups, remaining_days = self._plan_days(
+            num_days, len(profile_questions),
+            [len(gateway_days[section]['core_questions']) for section in section_order],
+            len(other_core))
         
-        # Day 4: Insomnia Gateway (CRITICAL)
-        daily_schedule[4] = {
-            'day': 4,
-            'title': 'Sleep Difficulties',
-            'description': 'Understanding your sleep patterns.',
-            'core_questions': insomnia_screen,
-            'estimated_minutes': 3,
-            'can_trigger_expansion': True,
-            'trigger_note': 'If you report sleep difficulties, we\'ll ask some additional questions to better understand your situation.'
-        }
+        daily_schedule = {}
+        day_num = 1
         
-        # Day 5: Daytime Function Gateway
-        daily_schedule[5] = {
-            'day': 5,
-            'title': 'Daytime Energy',
-            'description': 'How do you feel during the day?',
-            'core_questions': daytime_function,
-            'estimated_minutes': 3,
-            'can_trigger_expansion': True,
-            'trigger_note': 'Excessive daytime sleepiness may require deeper assessment.'
-        }
+        # Profile days: welcome + demographics, then the sleep quality check.
+        # Compressed layouts keep the welcome day and end on the sleep quality check
+        profile_titles = [
+            ('Welcome to ZOE', 'Let\'s start with some basic information about you.'),
+            ('Basic Profile', 'A few more details to personalize your assessment.'),
+            ('Sleep Quality Check', 'How has your sleep been lately?')
+        ]
+        profile_titles = profile_titles[:1] + profile_titles[len(profile_titles) - profile_days + 1:]
         
-        # Day 6: Sleep Apnea Gateway
-        daily_schedule[6] = {
-            'day': 6,
-            'title': 'Breathing & Sleep',
-            'description': 'Checking for breathing-related sleep issues.',
-            'core_questions': apnea_screen,
-            'estimated_minutes': 3,
-            'can_trigger_expansion': True,
-            'trigger_note': 'Snoring or breathing pauses during sleep are important indicators.'
-        }
+        for (title, description), day_questions in zip(profile_titles,
+                                                       self._spread(profile_questions, profile_days)):
+            daily_schedule[day_num] = {
+                'day': day_num,
+                'title': title,
+                'description': description,
+                'core_questions': day_questions,
+                'estimated_minutes': max(2, len(day_questions) // 2),
+                'can_trigger_expansion': False
+            }
+            day_num += 1
         
-        # Days 7-14: Distribute remaining core questions
-        remaining_questions = other_core
-        questions_per_day = max(2, len(remaining_questions) // 8)
+        # Gateway days, in the requested section order; short schedules share days
+        sections = list(section_order)
+        for group_size in gateway_groups:
+            group = [gateway_days[section] for section in sections[:group_size]]
+            sections = sections[group_size:]
+            
+            if len(group) == 1:
+                daily_schedule[day_num] = {'day': day_num, **group[0]}
+            else:
+                day_questions = [q for day in group for q in day['core_questions']]
+                daily_schedule[day_num] = {
+                    'day': day_num,
+                    'title': ', '.join(day['title'] for day in group),
+                    'description': ' '.join(day['description'] for day in group),
+                    'core_questions': day_questions,
+                    'estimated_minutes': 2 + len(day_questions) // 2,
+                    'can_trigger_expansion': True,
+                    'trigger_note': ' '.join(day['trigger_note'] for day in group)
+                }
+            day_num += 1
         
-        day_num = 7
+        # Remaining days: spread the remaining core questions evenly
         themes = [
             ('Circadian Rhythm', 'Understanding your natural sleep-wake cycle.'),
             ('Sleep Environment', 'How your bedroom affects your sleep.'),
@@ -126,14 +192,9 @@ class QuestionDistributor:
             ('Final Questions', 'Completing your sleep profile.')
         ]
         
-        for i in range(0, len(remaining_questions), questions_per_day):
-            if day_num > 14:
-                break
-            
-            theme_idx = min(day_num - 7, len(themes) - 1)
-            theme, desc = themes[theme_idx]
-            
-            day_questions = remaining_questions[i:i + questions_per_day]
+        for i, day_questions in enumerate(self._spread(other_core, remaining_days)):
+            # Stretch the themes evenly over however many days remain
+            theme, desc = themes[i * len(themes) // remaining_days]
             
             daily_schedule[day_num] = {
                 'day': day_num,
@@ -143,50 +204,107 @@ class QuestionDistributor:
                 'estimated_minutes': 2 + len(day_questions) // 2,
                 'can_trigger_expansion': False
             }
-            
             day_num += 1
         
         return daily_schedule
     
-    def add_expansion_logic(self, daily_schedule: Dict[int, Any]) -> Dict[int, Any]:
+    @staticmethod
+    def _spread(questions: List[Dict], num_days: int) -> List[List[Dict]]:
+        """Split questions over num_days as evenly as possible, earlier days first"""
+        base, extra = divmod(len(questions), num_days)
+        chunks = []
+        start = 0
+        for day in range(num_days):
+            size = base + (1 if day < extra else 0)
+            chunks.append(questions[start:start + size])
+            start += size
+        return chunks
+    
+    @staticmethod
+    def _plan_days(num_days: int, profile_count: int, gateway_sizes: List[int],
+                   remaining_count: int) -> tuple:
         """
-        Add expansion module information to schedule based on conditional rules.
+        Choose (profile days, gateway day group sizes, remaining days) for
+        num_days. Picks the layout with the lightest busiest day, preferring
+        the full layout (3 profile days, one day per gateway) on ties, so
+        short schedules compress days 1-6 instead of piling questions onto
+        the last day.
         """
         
-        # Map trigger questions to expansion modules
-        trigger_map = {}
-        for rule in self.conditional_rules:
-            trigger_q_id = rule['trigger_question_id']
-            modules = rule['expanded_modules']
+        # Contiguous groupings of the gateway sections into shared days
+        n = len(gateway_sizes)
+        groupings = [[n]]
+        if n > 1:
+            groupings = [[i, n - i] for i in range(1, n)] + [[1] * n]
+            if n == 3:
+                groupings.append([3])
+        
+        best = None
+        for profile_days in range(1, 4):
+            for groups in groupings:
+                remaining_days = num_days - profile_days - len(groups)
+                if remaining_days < (1 if remaining_count else 0) or remaining_days > remaining_count:
+                    continue
+                
+                profile_load = math.ceil(profile_count / profile_days)
+                sizes = iter(gateway_sizes)
+                gateway_load = max(sum(next(sizes) for _ in range(size)) for size in groups)
+                remaining_load = math.ceil(remaining_count / remaining_days) if remaining_days else 0
+                
+                key = (max(profile_load, gateway_load, remaining_load), -(profile_days + len(groups)))
+                if best is None or key < best[0]:
+                    best = (key, (profile_days, groups, remaining_days))
+        
+        if best is None:
+            raise ValueError(f"Can't lay out {num_days} days")
+        return best[1]
+    
+    def _expansion_details(self, trigger_q_id: str, modules: Optional[frozenset] = None) -> List[Dict]:
+        """Expansion modules for a trigger question, limited to an allowed module set"""
+        
+        key = (trigger_q_id, modules)
+        if key not in self._expansion_cache:
+            expansion_details = []
             
-            trigger_map[trigger_q_id] = {
-                'condition': rule['condition'],
-                'modules': modules,
-                'rule_text': rule['rule_text']
-            }
+            for module_name in self.trigger_map[trigger_q_id]['modules']:
+                if modules is not None and module_name not in modules:
+                    continue
+                if module_name in self.expansion_questions_by_module:
+                    module_questions = self.expansion_questions_by_module[module_name]
+                    expansion_details.append({
+                        'module': module_name,
+                        'question_count': len(module_questions),
+                        'questions': module_questions
+                    })
+            
+            self._expansion_cache[key] = expansion_details
+        
+        return self._expansion_cache[key]
+    
+    def add_expansion_logic(self, daily_schedule: Dict[int, Any],
+                            modules: Optional[List[str]] = None) -> Dict[int, Any]:
+        """
+        Add expansion module information to schedule based on conditional rules.
+        If modules is given, only those expansion modules are offered.
+        """
+        
+        allowed_modules = (frozenset(MODULE_ALIASES.get(m, m) for m in modules)
+                           if modules is not None else None)
         
         # Add expansion info to each day
         for day_num, day_info in daily_schedule.items():
             day_info['possible_expansions'] = []
             
             for question in day_info['core_questions']:
-                if question['id'] in trigger_map:
-                    trigger_info = trigger_map[question['id']]
-                    
-                    # Calculate expansion question count
-                    expansion_count = 0
-                    expansion_details = []
-                    
-                    for module_name in trigger_info['modules']:
-                        if module_name in self.expansion_questions_by_module:
-                            module_questions = self.expansion_questions_by_module[module_name]
-                            expansion_count += len(module_questions)
-                            expansion_details.append({
-                                'module': module_name,
-                                'question_count': len(module_questions),
-                                'questions': module_questions
-                            })
+                if question['id'] in self.trigger_map:
+                    trigger_info = self.trigger_map[question['id']]
+                    expansion_details = self._expansion_details(question['id'], allowed_modules)
+                    expansion_count = sum(m['question_count'] for m in expansion_details)
                     
+                    # Nothing to expand into (modules not parsed or not in this cohort)
+                    if not expansion_details:
+                        continue
+
                     day_info['possible_expansions'].append({
                         'trigger_question': question,
                         'condition': trigger_info['condition'],
@@ -208,36 +326,51 @@ class QuestionDistributor:
         
         return daily_schedule
     
-    def generate_schedule(self, output_file: str = None):
-        """Generate complete 14-day schedule with expansion logic"""
-        
-        print("🗓️  Generating 14-day distribution schedule...")
+    def build_schedule(self, num_days: int = 14, section_order: Optional[List[str]] = None,
+                       modules: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Build a schedule with expansion logic and its statistics"""
         
-        schedule = self.distribute_14_days()
-        schedule = self.add_expansion_logic(schedule)
+        schedule = self.distribute_days(num_days, section_order)
+        schedule = self.add_expansion_logic(schedule, modules)
         
         # Calculate statistics
         total_core = sum(len(day['core_questions']) for day in schedule.values())
         days_with_expansions = sum(1 for day in schedule.values() if day['can_trigger_expansion'])
+        max_per_day = max(len(day['core_questions']) for day in schedule.values())
         
-        stats = {
-            'total_days': 14,
+        return {
+            'total_days': len(schedule),
             'total_core_questions': total_core,
             'days_with_potential_expansions': days_with_expansions,
-            'average_questions_per_day': total_core / 14,
+            'average_questions_per_day': total_core / len(schedule),
+            'max_core_questions_per_day': max_per_day,
             'schedule': schedule
         }
+    
+    def generate_schedule(self, output_file: str = None, num_days: int = 14,
+                          section_order: Optional[List[str]] = None,
+                          modules: Optional[List[str]] = None):
+        """Generate complete schedule with expansion logic"""
+        
+        print(f"🗓️  Generating {num_days}-day distribution schedule...")
+        
+        stats = self.build_schedule(num_days, section_order, modules)
+        schedule = stats['schedule']
+        total_core = stats['total_core_questions']
+        days_with_expansions = stats['days_with_potential_expansions']
         
         if output_file:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(stats, f, indent=2, ensure_ascii=False)
-            print(f"✅ Saved 14-day schedule to {output_file}")
+            self._write_schedule(stats, output_file)
+            print(f"✅ Saved {num_days}-day schedule to {output_file}")
         
         # Print summary
         print(f"\n📊 Schedule Summary:")
         print(f"   Total Core Questions: {total_core}")
-        print(f"   Average per Day: {total_core / 14:.1f}")
+        print(f"   Average per Day: {stats['average_questions_per_day']:.1f}")
         print(f"   Days with Potential Expansions: {days_with_expansions}")
+        if stats['max_core_questions_per_day'] > TARGET_MAX_QUESTIONS_PER_DAY:
+            print(f"   ⚠️  Up to {stats['max_core_questions_per_day']} core questions on one day "
+                  f"(target is 2-{TARGET_MAX_QUESTIONS_PER_DAY})")
         
         print(f"\n📅 Daily Breakdown:")
         for day_num in sorted(schedule.keys()):
@@ -254,6 +387,77 @@ class QuestionDistributor:
                           f"(+{exp['estimated_additional_minutes']}min)")
         
         return stats
+    
+    def _write_schedule(self, stats: Dict[str, Any], output_file: str):
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2, ensure_ascii=False)
+    
+    def generate_variants(self, variants_file: str, output_dir: str = '.',
+                          max_workers: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Generate every schedule variant listed in a variant spec file.
+        Questions, rules and expansion lookups are loaded once and shared;
+        the variant files are written in parallel.
+        
+        Spec format (JSON list):
+        [{"name": "7day", "days": 7, "section_order": [...], "modules": [...]}]
+        section_order and modules are optional.
+        """
+        
+        with open(variants_file, 'r') as f:
+            variants = json.load(f)
+        
+        # Validate the whole spec before building anything
+        names = [variant['name'] for variant in variants]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate variant names in {variants_file}: {', '.join(duplicates)}")
+        
+        for variant in variants:
+            modules = [MODULE_ALIASES.get(m, m) for m in variant.get('modules') or []]
+            unknown = [m for m in modules
+                       if m not in self.rule_modules and m not in self.expansion_questions_by_module]
+            if unknown:
+                raise ValueError(f"Variant {variant['name']!r} lists unknown modules {unknown}; known modules: "
+                                 f"{sorted(self.rule_modules | set(self.expansion_questions_by_module) | set(MODULE_ALIASES))}")
+            
+            # Known, but offered only if a rule triggers it and its sheet was parsed
+            unreachable = [m for m in modules
+                           if m not in self.rule_modules or m not in self.expansion_questions_by_module]
+            if unreachable:
+                print(f"⚠️  Variant {variant['name']}: {', '.join(unreachable)} will never be offered "
+                      f"(no rule triggers it, or no parsed questions)")
+        
+        print(f"🗓️  Generating {len(variants)} schedule variants...")
+        
+        results = {}
+        for variant in variants:
+            results[variant['name']] = self.build_schedule(
+                variant.get('days', 14),
+                variant.get('section_order'),
+                variant.get('modules')
+            )
+        
+        output_path = Path(output_dir)
+        output_path.mkdir(exist_ok=True)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                name: executor.submit(self._write_schedule, stats,
+                                      output_path / f'{name}_schedule.json')
+                for name, stats in results.items()
+            }
+            for name, future in futures.items():
+                future.result()
+                stats = results[name]
+                print(f"   ✅ {name}: {stats['total_days']} days, "
+                      f"{stats['total_core_questions']} core questions "
+                      f"→ {output_path / f'{name}_schedule.json'}")
+                if stats['max_core_questions_per_day'] > TARGET_MAX_QUESTIONS_PER_DAY:
+                    print(f"      ⚠️  up to {stats['max_core_questions_per_day']} core questions on one day "
+                          f"(target is 2-{TARGET_MAX_QUESTIONS_PER_DAY})")
+        
+        return results
 
 
 if __name__ == '__main__':
@@ -262,4 +466,10 @@ if __name__ == '__main__':
     output_file = '/Users/martinkawalski/ZOE/data/14day_schedule.json'
     
     distributor = QuestionDistributor(questions_file, rules_file)
-    distributor.generate_schedule(output_file)
+    
+    if len(sys.argv) > 1:
+        # Batch mode: python3 distribute_questions.py <variants.json>
+        distributor.generate_variants(sys.argv[1], str(Path(output_file).parent))
+    else:
+        stats = distributor.generate_schedule(output_file)
+        ScheduleBundler(stats).write(str(Path(output_file).parent / 'bundles'))
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+ZOE Adaptive Onboarding - Trigger Event Stream
+Asyncio publish/subscribe bus for answer-recorded, expansion-triggered and
+day-completed events. Every subscriber consumes from its own bounded queue
+in its own task, so scoring, analytics writers and clinician alerting run
+concurrently with the answer path.
+"""
+
+import asyncio
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Any, Callable, Awaitable, Iterable
+
+ANSWER_RECORDED = 'answer_recorded'
+EXPANSION_TRIGGERED = 'expansion_triggered'
+DAY_COMPLETED = 'day_completed'
+
+EVENT_TYPES = (ANSWER_RECORDED, EXPANSION_TRIGGERED, DAY_COMPLETED)
+
+# What a subscriber does when its queue is full:
+#   'block'       - publishers wait until the subscriber has room (backpressure,
+#                   lossless); a block_timeout turns a longer wait into a drop
+#   'drop_oldest' - the oldest queued event is discarded; publishers never wait
+OVERFLOW_POLICIES = ('block', 'drop_oldest')
+
+
+def make_event(event_type: str, user_id: str, day: int = None, **payload) -> Dict[str, Any]:
+    """Build an event dict; used by the simulator and serving layers alike"""
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Unknown event type {event_type!r}, expected one of {EVENT_TYPES}")
+
+    return {
+        'type': event_type,
+        'user_id': user_id,
+        'day': day,
+        'timestamp': datetime.now().isoformat(),
+        **payload
+    }
+
+
+class Subscription:
+    def __init__(self, name: str, handler: Callable[[Dict], Awaitable[None]],
+                 event_types: Iterable[str], maxsize: int, overflow: str,
+                 block_timeout: float = None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+
+        self.name = name
+        self.handler = handler
+        self.event_types = tuple(event_types)
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.task = None
+
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def offer(self, event: Dict) -> bool:
+        """Queue an event without waiting; False if a 'block' queue is full"""
+        if self.queue.full():
+            if self.overflow == 'block':
+                return False
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+        return True
+
+    async def put(self, event: Dict):
+        """Wait for room in a full 'block' queue; None block_timeout waits indefinitely"""
+        try:
+            await asyncio.wait_for(self.queue.put(event), self.block_timeout)
+        except asyncio.TimeoutError:
+            self.dropped += 1
+
+    async def consume(self):
+        while True:
+            event = await self.queue.get()
+            try:
+                await self.handler(event)
+                self.delivered += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                # A failing consumer must not take down the stream
+                self.errors += 1
+                print(f"⚠️  Subscriber {self.name} failed on {event['type']}: {error}", file=sys.stderr)
+            finally:
+                self.queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'queued': self.queue.qsize()
+        }
+
+
+class EventBus:
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self.subscriptions = []
+        self._by_type = defaultdict(list)
+        self._loop = None
+        self._closed = False
+
+    async def __aenter__(self) -> 'EventBus':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def subscribe(self, name: str, handler: Callable[[Dict], Awaitable[None]],
+                  event_types: Iterable[str] = EVENT_TYPES, maxsize: int = None,
+                  overflow: str = 'block', block_timeout: float = None) -> Subscription:
+        """
+        Register an async handler; it runs in its own task with its own queue.
+        Subscribers that can afford to lose events (analytics) should opt
+        into overflow='drop_oldest' so they never slow publishers.
+        """
+
+        subscription = Subscription(name, handler, event_types, maxsize or self.maxsize,
+                                    overflow, block_timeout)
+        subscription.task = asyncio.get_running_loop().create_task(subscription.consume())
+        self._loop = asyncio.get_running_loop()
+
+        self.subscriptions.append(subscription)
+        for event_type in subscription.event_types:
+            self._by_type[event_type].append(subscription)
+        return subscription
+
+    async def publish(self, event: Dict):
+        """
+        Fan an event out to matching subscribers. Only full 'block'
+        subscribers are waited on, all at once rather than one after another.
+        """
+        if self._closed:
+            raise RuntimeError("EventBus is closed")
+
+        full = [subscription for subscription in self._by_type.get(event['type'], ())
+                if not subscription.offer(event)]
+        if not full:
+            return
+
+        await asyncio.gather(*(subscription.put(event) for subscription in full))
+
+    def threadsafe_publisher(self) -> Callable[[Dict], None]:
+        """
+        Sync publish callable for producers running in another thread
+        (e.g. PatientSimulator under asyncio.to_thread). Backpressure blocks
+        the producer thread, never the event loop.
+        """
+        loop = self._loop or asyncio.get_running_loop()
+
+        def publish(event: Dict):
+            asyncio.run_coroutine_threadsafe(self.publish(event), loop).result()
+
+        return publish
+
+    async def drain(self):
+        """Wait until every queued event has been handled"""
+        await asyncio.gather(*(s.queue.join() for s in self.subscriptions))
+
+    async def close(self):
+        """Drain all queues, then stop the consumer tasks"""
+        if self._closed:
+            return
+        await self.drain()
+        self._closed = True
+
+        for subscription in self.subscriptions:
+            subscription.task.cancel()
+        await asyncio.gather(*(s.task for s in self.subscriptions), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {s.name: s.stats() for s in self.subscriptions}
+
+
+async def run_benchmark(n_events: int = 100_000, n_subscribers: int = 100,
+                        maxsize: int = 1000, slow_subscribers: int = 0,
+                        slow_delay: float = 0.001, slow_overflow: str = 'drop_oldest') -> Dict[str, Any]:
+    """
+    Publish n_events to n_subscribers (half blocking, half dropping). The
+    first slow_subscribers handlers take slow_delay seconds per event and
+    use slow_overflow, so their queues fill and exercise backpressure or
+    dropping.
+    """
+
+    async def handler(event: Dict):
+        pass
+
+    async def slow_handler(event: Dict):
+        await asyncio.sleep(slow_delay)
+
+    async with EventBus(maxsize=maxsize) as bus:
+        for i in range(n_subscribers):
+            if i < slow_subscribers:
+                bus.subscribe(f'subscriber_{i}', slow_handler, overflow=slow_overflow)
+            else:
+                bus.subscribe(f'subscriber_{i}', handler,
+                              overflow='block' if i % 2 == 0 else 'drop_oldest')
+
+        events = [make_event(ANSWER_RECORDED, f'user_{i % 1000}', day=1 + i % 14,
+                             question_id='CORE_10', response='Yes')
+                  for i in range(n_events)]
+
+        start = time.perf_counter()
+        for event in events:
+            await bus.publish(event)
+        publish_elapsed = time.perf_counter() - start
+        await bus.drain()
+        elapsed = time.perf_counter() - start
+
+    stats = bus.stats().values()
+    return {
+        'events': n_events,
+        'subscribers': n_subscribers,
+        'slow_subscribers': slow_subscribers,
+        'publish_seconds': publish_elapsed,
+        'total_seconds': elapsed,
+        'publishes_per_second': n_events / publish_elapsed,
+        'events_per_second': n_events / elapsed,
+        'deliveries_per_second': sum(s['delivered'] for s in stats) / elapsed,
+        'dropped': sum(s['dropped'] for s in stats)
+    }
+
+
+if __name__ == '__main__':
+    print("⚡ Event stream throughput benchmark")
+    for n_subscribers in (1, 10, 100, 500):
+        result = asyncio.run(run_benchmark(n_events=20_000, n_subscribers=n_subscribers))
+        print(f"   {n_subscribers:4d} subscribers: {result['events_per_second']:10,.0f} events/s, "
+              f"{result['deliveries_per_second']:12,.0f} deliveries/s, "
+              f"{result['dropped']:,} dropped")
+
+    # Slow consumers with small queues: slow 'block' subscribers hold the
+    # answer path (publishes/s) to their pace without losing events, slow
+    # 'drop_oldest' subscribers leave it fast and drop instead
+    print("\n🐢 Slow subscribers (1ms per event, queues of 100)")
+    for slow_overflow in OVERFLOW_POLICIES:
+        for slow_subscribers in (1, 10):
+            result = asyncio.run(run_benchmark(n_events=2_000, n_subscribers=100, maxsize=100,
+                                               slow_subscribers=slow_subscribers,
+                                               slow_overflow=slow_overflow))
+            print(f"   {slow_subscribers:4d} slow ({slow_overflow:11s}): "
+                  f"{result['publishes_per_second']:10,.0f} publishes/s, "
+                  f"{result['deliveries_per_second']:12,.0f} deliveries/s, "
+                  f"{result['dropped']:,} dropped")
@@ -6,25 +6,85 @@ Simulates user responses and tracks adaptive expansion logic.
 
 import json
 import random
+import re
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Callable
 from datetime import datetime, timedelta
 
+from event_stream import make_event, ANSWER_RECORDED, EXPANSION_TRIGGERED, DAY_COMPLETED
+
+
+def compile_condition(condition: str) -> Callable[[Any], bool]:
+    """Compile a rule condition into a predicate over a single response"""
+    
+    condition = condition.upper()
+    
+    # Parse trigger conditions
+    if 'YES' in condition:
+        return lambda response: response == 'Yes'
+    
+    elif 'OFTEN' in condition or 'ALWAYS' in condition:
+        return lambda response: response in ('Often', 'Always')
+    
+    elif '>' in condition:
+        # Numeric threshold
+        try:
+            threshold = float(condition.split('>')[1].strip().replace('in', ''))
+        except ValueError:
+            return lambda response: False
+        
+        def above_threshold(response: Any) -> bool:
+            try:
+                return float(response) > threshold
+            except (TypeError, ValueError):
+                return False
+        
+        return above_threshold
+    
+    return lambda response: False
+
+
 class PatientSimulator:
-    def __init__(self, schedule_file: str):
+    def __init__(self, schedule_file: str, user_id: str = 'simulated_user',
+                 event_sink: Callable[[Dict], None] = None):
         with open(schedule_file, 'r') as f:
             data = json.load(f)
             self.schedule = data['schedule']
         
+        # Optional sink for trigger events, e.g. EventBus.threadsafe_publisher()
+        self.user_id = user_id
+        self.event_sink = event_sink
+        
         self.user_responses = {}
         self.triggered_expansions = []
         self.daily_logs = {}
         
+        # Instrument scores, updated incrementally as expansion answers arrive.
+        # Scoring needs NumPy; imported here so replay (which only needs
+        # compile_condition) and unscored simulation run on the standard library
+        try:
+            from score_instruments import InstrumentScorer
+        except ImportError:
+            self.scorer = None
+            self.user_scores = None
+        else:
+            self.scorer = InstrumentScorer()
+            self.user_scores = self.scorer.new_user()
+        
+    def emit(self, event_type: str, day: int, **payload):
+        if self.event_sink:
+            self.event_sink(make_event(event_type, self.user_id, day, **payload))
+    
     def simulate_response(self, question: Dict) -> Any:
         """Simulate a realistic response based on question type"""
         
         answer_type = question['answer_type']
         
+        # Expansion instruments print their item range, e.g. "(1-7)"
+        item_range = re.search(r'\((\d+)-(\d+)\)\s*$', question['text'])
+        if question.get('module', 'CORE') != 'CORE' and item_range:
+            return random.randint(int(item_range.group(1)), int(item_range.group(2)))
+        
         if answer_type == 'boolean':
             # 30% chance of triggering expansions (realistic problematic sleep)
             return random.choice(['Yes', 'No']) if random.random() > 0.3 else 'Yes'
@@ -70,28 +130,7 @@ class PatientSimulator:
     
     def check_expansion_trigger(self, question: Dict, response: Any, expansion_info: Dict) -> bool:
         """Check if a response triggers an expansion"""
-        
-        condition = expansion_info['condition'].upper()
-        
-        # Parse trigger conditions
-        if 'YES' in condition:
-            return response == 'Yes'
-        
-        elif 'OFTEN' in condition or 'ALWAYS' in condition:
-            return response in ['Often', 'Always']
-        
-        elif 'ANY YES' in condition:
-            return response == 'Yes'
-        
-        elif '>' in condition:
-            # Numeric threshold
-            try:
-                threshold = float(condition.split('>')[1].strip().replace('in', ''))
-                return float(response) > threshold
-            except:
-                return False
-        
-        return False
+        return compile_condition(expansion_info['condition'])(response)
     
     def simulate_day(self, day_num: int, persona: str = 'balanced') -> Dict:
         """
@@ -122,6 +161,7 @@ class PatientSimulator:
                 'day': day_num,
                 'timestamp': datetime.now().isoformat()
             }
+            self.emit(ANSWER_RECORDED, day_num, question_id=question['id'], response=response)
             
             day_log['core_questions_completed'].append({
                 'id': question['id'],
@@ -165,6 +205,10 @@ class PatientSimulator:
                                 'expansion': True,
                                 'timestamp': datetime.now().isoformat()
                             }
+                            if self.user_scores:
+                                self.user_scores.record(exp_q['id'], exp_response)
+                            self.emit(ANSWER_RECORDED, day_num, question_id=exp_q['id'],
+                                      response=exp_response, module=module_name, expansion=True)
                             day_log['total_questions_answered'] += 1
                     
                     day_log['expansions_triggered'].append(expansion_triggered)
@@ -175,17 +219,24 @@ class PatientSimulator:
                         'modules': expansion_triggered['modules'],
                         'question_count': expansion_triggered['additional_questions']
                     })
+                    self.emit(EXPANSION_TRIGGERED, day_num, **expansion_triggered)
         
         self.daily_logs[day_num] = day_log
+        self.emit(DAY_COMPLETED, day_num,
+                  total_questions_answered=day_log['total_questions_answered'],
+                  total_time_minutes=day_log['total_time_minutes'],
+                  expansions_triggered=len(day_log['expansions_triggered']))
         return day_log
     
     def simulate_full_journey(self, persona: str = 'balanced') -> Dict:
-        """Simulate complete 14-day patient journey"""
+        """Simulate the complete patient journey over every day in the schedule"""
+        
+        total_days = len(self.schedule)
         
         print(f"\n🎭 Simulating Patient Journey (Persona: {persona})")
         print("=" * 80)
         
-        for day in range(1, 15):
+        for day in sorted(int(day_num) for day_num in self.schedule):
             day_log = self.simulate_day(day, persona)
             
             expansion_note = ""
@@ -206,21 +257,22 @@ class PatientSimulator:
         report = {
             'persona': persona,
             'simulation_date': datetime.now().isoformat(),
-            'total_days': 14,
+            'total_days': total_days,
             'total_questions_answered': total_questions,
             'total_time_minutes': total_time,
             'expansions_triggered_count': total_expansions,
             'expansions_triggered': self.triggered_expansions,
             'daily_logs': self.daily_logs,
-            'user_responses': self.user_responses
+            'user_responses': self.user_responses,
+            'instrument_scores': self.user_scores.scores() if self.user_scores else {}
         }
         
         print("\n" + "=" * 80)
         print(f"📊 Journey Summary:")
         print(f"   Total Questions: {total_questions}")
-        print(f"   Total Time: {total_time} minutes (~{total_time / 60:.1f} hours over 14 days)")
+        print(f"   Total Time: {total_time} minutes (~{total_time / 60:.1f} hours over {total_days} days)")
         print(f"   Expansions Triggered: {total_expansions}")
-        print(f"   Average per Day: {total_questions / 14:.1f} questions, {total_time / 14:.1f} minutes")
+        print(f"   Average per Day: {total_questions / total_days:.1f} questions, {total_time / total_days:.1f} minutes")
         
         if self.triggered_expansions:
             print(f"\n🔄 Triggered Expansion Modules:")
@@ -228,6 +280,13 @@ class PatientSimulator:
                 print(f"   Day {expansion['day']}: {', '.join(expansion['modules'])} "
                       f"(+{expansion['question_count']} questions)")
         
+        if report['instrument_scores']:
+            print(f"\n🧮 Instrument Scores:")
+            for instrument, result in report['instrument_scores'].items():
+                scores = ', '.join(f"{name}={score}" for name, score in result['scores'].items())
+                bands = ', '.join(label for label in result['severity'].values() if label)
+                print(f"   {instrument}: {scores}" + (f" ({bands})" if bands else ""))
+        
         return report
     
     def save_journey_report(self, output_file: str, persona: str = 'balanced'):
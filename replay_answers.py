@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+ZOE Adaptive Onboarding - Answer Log Replay
+Replays recorded answer logs against candidate conditional rules and schedule
+to report which users and days would trigger different expansions.
+"""
+
+import json
+import os
+import pickle
+import re
+import sys
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Set, Any, Optional
+from collections import defaultdict
+
+from patient_simulator import compile_condition
+
+
+def load_schedule_days(schedule_file: str) -> Dict[str, int]:
+    """Map each scheduled core question id to its day"""
+    with open(schedule_file, 'r') as f:
+        schedule = json.load(f)['schedule']
+
+    return {question['id']: int(day)
+            for day, day_info in schedule.items()
+            for question in day_info['core_questions']}
+
+
+def compile_rules(rules: List[Dict], question_days: Dict[str, int]) -> List[tuple]:
+    """Compile rules into (trigger question id, day, predicate, modules) tuples"""
+    return [(rule['trigger_question_id'],
+             question_days.get(rule['trigger_question_id']),
+             compile_condition(rule['condition']),
+             tuple(rule['expanded_modules']))
+            for rule in rules]
+
+
+def triggered_by_day(compiled_rules: List[tuple], answers: Dict[str, tuple]) -> Dict[int, Set[str]]:
+    """
+    Expansion modules a user's answers trigger, grouped by schedule day.
+    Sets, so reordering rules (or two rules naming one module) is not a change.
+    """
+    triggered = defaultdict(set)
+
+    for question_id, day, predicate, modules in compiled_rules:
+        if day is None or question_id not in answers:
+            continue
+        if predicate(answers[question_id][1]):
+            triggered[day].update(modules)
+
+    return triggered
+
+
+def _chunk_ranges(log_file: str, n_chunks: int) -> List[tuple]:
+    """Split a file into byte ranges; lines are assigned by their start offset"""
+    size = os.path.getsize(log_file)
+    step = max(1, -(-size // n_chunks))
+    return [(start, min(start + step, size)) for start in range(0, size, step)]
+
+
+def _scan_chunk(log_file: str, start: int, end: int, trigger_ids: List[str], n_buckets: int,
+                spill_prefix: str) -> tuple:
+    """
+    Map step: read the lines starting in [start, end) and keep only the
+    latest answer per (user, trigger question), partitioned by user bucket.
+    Each non-empty bucket is spilled to '<spill_prefix>.<bucket>.pickle';
+    returns the answer count and the spill file per bucket (None if empty).
+    """
+
+    # One regex pass per line before paying for json.loads
+    trigger_pattern = re.compile(b'"question_id":\\s*"(?:' +
+                                 b'|'.join(re.escape(q.encode()) for q in trigger_ids) + b')"')
+    trigger_set = set(trigger_ids)
+    buckets = [defaultdict(dict) for _ in range(n_buckets)]
+    answers_scanned = 0
+
+    with open(log_file, 'rb') as f:
+        # Step back one byte so a line starting exactly at `start` is kept
+        if start:
+            f.seek(start - 1)
+            f.readline()
+
+        position = f.tell()
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+
+            if not line.strip():
+                continue
+            answers_scanned += 1
+
+            if not trigger_pattern.search(line):
+                continue
+
+            record = json.loads(line)
+            question_id = record.get('question_id')
+            user_id = record.get('user_id')
+            if question_id not in trigger_set or user_id is None:
+                continue
+
+            user_id = str(user_id)
+            answer = (record.get('timestamp') or '', record.get('response'))
+            bucket = buckets[zlib.crc32(user_id.encode()) % n_buckets]
+            previous = bucket[user_id].get(question_id)
+            if previous is None or answer[0] >= previous[0]:
+                bucket[user_id][question_id] = answer
+
+    spill_files = []
+    for index, bucket in enumerate(buckets):
+        if not bucket:
+            spill_files.append(None)
+            continue
+        spill_file = f'{spill_prefix}.{index}.pickle'
+        with open(spill_file, 'wb') as f:
+            pickle.dump(dict(bucket), f, protocol=pickle.HIGHEST_PROTOCOL)
+        spill_files.append(spill_file)
+
+    return answers_scanned, spill_files
+
+
+def _diff_bucket(spill_files: List[str], baseline_rules: List[Dict], baseline_days: Dict[str, int],
+                 candidate_rules: List[Dict], candidate_days: Dict[str, int]) -> tuple:
+    """Reduce step: merge one user bucket's spill files across chunks and diff both rule sets"""
+
+    users = {}
+    for spill_file in spill_files:
+        with open(spill_file, 'rb') as f:
+            partition = pickle.load(f)
+        os.remove(spill_file)
+
+        for user_id, answers in partition.items():
+            merged = users.setdefault(user_id, {})
+            for question_id, answer in answers.items():
+                previous = merged.get(question_id)
+                if previous is None or answer[0] >= previous[0]:
+                    merged[question_id] = answer
+
+    baseline = compile_rules(baseline_rules, baseline_days)
+    candidate = compile_rules(candidate_rules, candidate_days)
+    changes = []
+
+    for user_id, answers in users.items():
+        before = triggered_by_day(baseline, answers)
+        after = triggered_by_day(candidate, answers)
+
+        changed_days = {}
+        for day in sorted(set(before) | set(after)):
+            if before.get(day, set()) != after.get(day, set()):
+                changed_days[day] = {'before': sorted(before.get(day, ())),
+                                     'after': sorted(after.get(day, ()))}
+
+        if changed_days:
+            changes.append({'user_id': user_id, 'days': changed_days})
+
+    return len(users), changes
+
+
+class AnswerReplayer:
+    def __init__(self, rules_file: str, schedule_file: str,
+                 candidate_rules_file: str, candidate_schedule_file: str = None,
+                 workers: Optional[int] = None):
+        with open(rules_file, 'r') as f:
+            self.baseline_rules = json.load(f)
+
+        with open(candidate_rules_file, 'r') as f:
+            self.candidate_rules = json.load(f)
+
+        self.baseline_days = load_schedule_days(schedule_file)
+        self.candidate_days = load_schedule_days(candidate_schedule_file or schedule_file)
+
+        # Only answers to trigger questions (old or new) can change an expansion
+        self.trigger_ids = sorted({rule['trigger_question_id']
+                                   for rule in self.baseline_rules + self.candidate_rules})
+        self.workers = workers or os.cpu_count() or 1
+
+    def replay(self, log_file: str, output_file: str = None) -> Dict[str, Any]:
+        """
+        Stream a JSONL answer log through both rule sets.
+        Each line is a user_responses entry plus a 'user_id' field.
+        Map workers spill their per-bucket answers to temp files, so the
+        parent never holds them. Each map worker holds the users of its own
+        byte range, and each reduce worker holds one bucket (roughly
+        users x trigger questions / buckets). Changed users are written to output_file as JSONL when given,
+        otherwise returned under 'changes'.
+        """
+
+        print(f"🔁 Replaying {log_file} with {self.workers} workers...")
+
+        n_buckets = self.workers * 4
+        ranges = _chunk_ranges(log_file, self.workers * 4)
+
+        with tempfile.TemporaryDirectory(prefix='zoe-replay-') as spill_dir, \
+                ProcessPoolExecutor(max_workers=self.workers) as executor:
+            scans = list(executor.map(
+                _scan_chunk,
+                [log_file] * len(ranges),
+                [start for start, _ in ranges],
+                [end for _, end in ranges],
+                [self.trigger_ids] * len(ranges),
+                [n_buckets] * len(ranges),
+                [os.path.join(spill_dir, f'chunk-{i}') for i in range(len(ranges))]
+            ))
+
+            # Only spill file names reach the parent, never the answers themselves
+            answers_scanned = sum(count for count, _ in scans)
+            bucket_files = [[files[b] for _, files in scans if files[b]] for b in range(n_buckets)]
+            del scans
+
+            diffs = executor.map(
+                _diff_bucket,
+                bucket_files,
+                [self.baseline_rules] * n_buckets,
+                [self.baseline_days] * n_buckets,
+                [self.candidate_rules] * n_buckets,
+                [self.candidate_days] * n_buckets
+            )
+
+            users_scanned = 0
+            users_changed = 0
+            changed_by_day = defaultdict(int)
+            all_changes = []
+            output = open(output_file, 'w', encoding='utf-8') if output_file else None
+
+            try:
+                for bucket_users, changes in diffs:
+                    users_scanned += bucket_users
+                    users_changed += len(changes)
+                    for change in changes:
+                        for day in change['days']:
+                            changed_by_day[day] += 1
+                        if output:
+                            output.write(json.dumps(change, ensure_ascii=False) + '\n')
+                        else:
+                            all_changes.append(change)
+            finally:
+                if output:
+                    output.close()
+
+        report = {
+            'log_file': log_file,
+            'answers_scanned': answers_scanned,
+            'users_with_trigger_answers': users_scanned,
+            'users_changed': users_changed,
+            'changed_by_day': dict(sorted(changed_by_day.items()))
+        }
+        if output_file:
+            report['changes_file'] = output_file
+        else:
+            report['changes'] = all_changes
+
+        print(f"\n📊 Replay Summary:")
+        print(f"   Answers Scanned: {answers_scanned:,}")
+        print(f"   Users with Trigger Answers: {users_scanned:,}")
+        print(f"   Users with Different Expansions: {users_changed:,}")
+        for day, count in report['changed_by_day'].items():
+            print(f"   Day {day:2d}: {count:,} users change")
+
+        return report
+
+
+if __name__ == '__main__':
+    data_dir = Path('/Users/martinkawalski/ZOE/data')
+    rules_file = data_dir / 'conditional_rules.json'
+    schedule_file = data_dir / '14day_schedule.json'
+
+    if len(sys.argv) < 3:
+        print("Usage: replay_answers.py <answers.jsonl> <candidate_rules.json> [candidate_schedule.json]")
+        sys.exit(2)
+
+    log_file = sys.argv[1]
+    candidate_rules_file = sys.argv[2]
+    candidate_schedule_file = sys.argv[3] if len(sys.argv) > 3 else None
+
+    replayer = AnswerReplayer(str(rules_file), str(schedule_file),
+                              candidate_rules_file, candidate_schedule_file)
+    report = replayer.replay(log_file, str(Path(log_file).with_suffix('.changes.jsonl')))
+
+    # Non-zero exit gates the publish pipeline until the changes are reviewed
+    sys.exit(1 if report['users_changed'] else 0)
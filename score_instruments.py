@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+ZOE Adaptive Onboarding - Instrument Scoring Engine
+Scores the validated expansion instruments (DBAS-16, FSS, FOSQ-10, DASS-21,
+PSAS, Sleep Hygiene) incrementally for a single user, or vectorized over
+NumPy response matrices for whole cohorts.
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterable
+
+import numpy as np
+
+# Per-instrument scoring definitions. Item numbers are 1-based and match the
+# question ids in modules.json (e.g. DASS-21_13 is item 13 of DASS-21).
+#   scale          - (min, max) valid item value
+#   reverse_items  - items scored as (min + max - value)
+#   method         - 'sum' or 'mean' of the items in a subscale / item total
+#   multiplier     - applied to subscale and item totals (DASS-21 doubles sums)
+#   total          - 'items' (all items), 'subscales' (mean of subscales) or None
+#   cutoffs        - score name -> [(lower bound, label), ...] in ascending order
+SCORING_DEFINITIONS = {
+    'DBAS-16': {
+        'items': 16,
+        'scale': (0, 10),
+        'reverse_items': [],
+        'method': 'mean',
+        'subscales': {
+            'Consequences': [5, 7, 9, 12, 16],
+            'Worry/Helplessness': [3, 4, 8, 10, 11, 14],
+            'Expectations': [1, 2],
+            'Medication': [6, 13, 15]
+        },
+        'total': 'items',
+        'cutoffs': {
+            'total': [(0, 'Adaptive beliefs'), (3.8, 'Dysfunctional beliefs')]
+        }
+    },
+    'FSS': {
+        'items': 9,
+        'scale': (1, 7),
+        'reverse_items': [],
+        'method': 'mean',
+        'subscales': {},
+        'total': 'items',
+        'cutoffs': {
+            'total': [(1, 'No significant fatigue'), (4, 'Significant fatigue')]
+        }
+    },
+    'FOSQ-10': {
+        # Higher is better (4 = no difficulty); total is 5x the subscale mean
+        'items': 10,
+        'scale': (1, 4),
+        'reverse_items': [],
+        'method': 'mean',
+        'subscales': {
+            'General Productivity': [1, 2, 4],
+            'Activity Level': [3, 5, 10],
+            'Social Outcome': [8, 9],
+            'Intimacy': [7],
+            'Vigilance': [6]
+        },
+        'total': 'subscales',
+        'total_multiplier': 5,
+        'cutoffs': {
+            'total': [(5, 'Impaired functioning'), (17.9, 'Normal functioning')]
+        }
+    },
+    'DASS-21': {
+        'items': 21,
+        'scale': (0, 3),
+        'reverse_items': [],
+        'method': 'sum',
+        'multiplier': 2,
+        'subscales': {
+            'Depression': [3, 5, 10, 13, 16, 17, 21],
+            'Anxiety': [2, 4, 7, 9, 15, 19, 20],
+            'Stress': [1, 6, 8, 11, 12, 14, 18]
+        },
+        'total': None,
+        'cutoffs': {
+            'Depression': [(0, 'Normal'), (10, 'Mild'), (14, 'Moderate'),
+                           (21, 'Severe'), (28, 'Extremely severe')],
+            'Anxiety': [(0, 'Normal'), (8, 'Mild'), (10, 'Moderate'),
+                        (15, 'Severe'), (20, 'Extremely severe')],
+            'Stress': [(0, 'Normal'), (15, 'Mild'), (19, 'Moderate'),
+                       (26, 'Severe'), (34, 'Extremely severe')]
+        }
+    },
+    'PSAS': {
+        'items': 16,
+        'scale': (1, 5),
+        'reverse_items': [],
+        'method': 'sum',
+        'subscales': {
+            'Cognitive': list(range(1, 9)),
+            'Somatic': list(range(9, 17))
+        },
+        'total': 'items',
+        'cutoffs': {
+            'Cognitive': [(8, 'Normal'), (20, 'Elevated cognitive arousal')],
+            'Somatic': [(8, 'Normal'), (14, 'Elevated somatic arousal')]
+        }
+    },
+    'Sleep Hygiene': {
+        # Sleep Hygiene Index: higher totals mean poorer hygiene, no clinical cutoff
+        'items': 13,
+        'scale': (0, 4),
+        'reverse_items': [],
+        'method': 'sum',
+        'subscales': {},
+        'total': 'items',
+        'cutoffs': {}
+    }
+}
+
+
+def parse_item_value(response: Any, scale: tuple) -> Optional[float]:
+    """Numeric item value for a raw response, or None if missing/out of range"""
+    try:
+        value = float(response)
+    except (TypeError, ValueError):
+        return None
+
+    if value != value or value < scale[0] or value > scale[1]:
+        return None
+    return value
+
+
+class InstrumentScorer:
+    def __init__(self, definitions: Dict[str, Dict] = None):
+        self.definitions = definitions or SCORING_DEFINITIONS
+        self.instruments = {}
+
+        # Question id prefix (as built by QuestionnaireParser) -> instrument
+        self.prefixes = {}
+
+        for name, definition in self.definitions.items():
+            self.instruments[name] = self._compile(definition)
+            self.prefixes[name.upper().replace(' ', '_')] = name
+
+    def _compile(self, definition: Dict) -> Dict[str, Any]:
+        """Precompute the weight matrix and cutoff arrays for one instrument"""
+
+        n_items = definition['items']
+        scale_min, scale_max = definition['scale']
+
+        # Score columns: one per subscale, plus an item total if requested
+        groups = dict(definition['subscales'])
+        if definition['total'] == 'items':
+            groups['total'] = list(range(1, n_items + 1))
+        score_names = list(groups)
+
+        # Items are summed with weight 1 and means divided afterwards: summing
+        # 1/n weights drifts below exact cutoffs (36/9 -> 3.9999999999999996)
+        weights = np.zeros((n_items, len(score_names)))
+        divisors = np.ones(len(score_names))
+        for col, items in enumerate(groups.values()):
+            weights[np.asarray(items) - 1, col] = 1.0
+            if definition['method'] == 'mean':
+                divisors[col] = len(items)
+
+        reverse = np.zeros(n_items, dtype=bool)
+        reverse[np.asarray(definition['reverse_items'], dtype=int) - 1] = True
+
+        # item index -> score columns it contributes to, for incremental updates
+        memberships = [
+            [col for col in range(len(score_names)) if weights[item, col]]
+            for item in range(n_items)
+        ]
+
+        cutoffs = {
+            score_name: (np.array([bound for bound, _ in bands], dtype=float),
+                         [label for _, label in bands])
+            for score_name, bands in definition['cutoffs'].items()
+        }
+
+        return {
+            'n_items': n_items,
+            'scale': (scale_min, scale_max),
+            'reverse': reverse,
+            'weights': weights,
+            'divisors': divisors,
+            'member': weights > 0,
+            'score_names': score_names,
+            'subscale_names': list(definition['subscales']),
+            'memberships': memberships,
+            'multiplier': definition.get('multiplier', 1),
+            'total': definition['total'],
+            'total_multiplier': definition.get('total_multiplier', 1),
+            'cutoffs': cutoffs
+        }
+
+    def locate(self, question_id: str) -> Optional[tuple]:
+        """Map a question id such as 'DASS-21_13' to (instrument, item index)"""
+        prefix, _, number = question_id.rpartition('_')
+        name = self.prefixes.get(prefix)
+        if name is None or not number.isdigit():
+            return None
+
+        item = int(number) - 1
+        if not 0 <= item < self.instruments[name]['n_items']:
+            return None
+        return name, item
+
+    def severity(self, instrument: str, score_name: str, score: Optional[float]) -> Optional[str]:
+        """Cutoff band label for a single score"""
+        if score is None or score_name not in self.instruments[instrument]['cutoffs']:
+            return None
+
+        bounds, labels = self.instruments[instrument]['cutoffs'][score_name]
+        idx = int(np.searchsorted(bounds, score, side='right')) - 1
+        return labels[idx] if idx >= 0 else None
+
+    def new_user(self) -> 'UserScores':
+        """Start an incremental score state for one user"""
+        return UserScores(self)
+
+    def score_matrix(self, instrument: str, responses: np.ndarray) -> Dict[str, Any]:
+        """
+        Score a cohort for one instrument.
+        responses: (n_users, n_items) float array, NaN for unanswered items.
+        A score is NaN unless every item it depends on was answered.
+        Severity codes index into the returned labels (-1 = unscored).
+        """
+
+        spec = self.instruments[instrument]
+        values = np.array(responses, dtype=float, copy=True)
+        if values.ndim != 2 or values.shape[1] != spec['n_items']:
+            raise ValueError(f"{instrument} expects a (n_users, {spec['n_items']}) matrix, "
+                             f"got {values.shape}")
+
+        scale_min, scale_max = spec['scale']
+        values[(values < scale_min) | (values > scale_max)] = np.nan
+        values[:, spec['reverse']] = scale_min + scale_max - values[:, spec['reverse']]
+
+        missing = np.isnan(values)
+        raw = np.where(missing, 0.0, values) @ spec['weights']
+        incomplete = (missing.astype(np.float32) @ spec['member'].astype(np.float32)) > 0
+        raw[incomplete] = np.nan
+        raw = raw / spec['divisors'] * spec['multiplier']
+
+        scores = {name: raw[:, col] for col, name in enumerate(spec['score_names'])}
+        if spec['total'] == 'subscales':
+            # Same left-to-right order as UserScores, so both paths agree bit for bit
+            total = np.zeros(values.shape[0])
+            for col in range(len(spec['subscale_names'])):
+                total += raw[:, col]
+            scores['total'] = total / len(spec['subscale_names']) * spec['total_multiplier']
+
+        severity = {}
+        labels = {}
+        for score_name, (bounds, band_labels) in spec['cutoffs'].items():
+            score = scores[score_name]
+            codes = np.searchsorted(bounds, np.nan_to_num(score, nan=-np.inf), side='right') - 1
+            codes[np.isnan(score)] = -1
+            severity[score_name] = codes
+            labels[score_name] = band_labels
+
+        return {
+            'instrument': instrument,
+            'n_users': values.shape[0],
+            'scores': scores,
+            'severity': severity,
+            'labels': labels
+        }
+
+    def score_cohort(self, matrices: Dict[str, np.ndarray]) -> Dict[str, Dict[str, Any]]:
+        """Score every instrument matrix in a cohort"""
+        return {instrument: self.score_matrix(instrument, matrix)
+                for instrument, matrix in matrices.items()}
+
+    def response_matrices(self, users: Iterable[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """
+        Build per-instrument response matrices from user_responses dicts
+        (question id -> {'response': ...}), one row per user.
+        """
+
+        users = list(users)
+        matrices = {name: np.full((len(users), spec['n_items']), np.nan)
+                    for name, spec in self.instruments.items()}
+
+        for row, user_responses in enumerate(users):
+            for question_id, entry in user_responses.items():
+                location = self.locate(question_id)
+                if location is None:
+                    continue
+                name, item = location
+                value = parse_item_value(entry['response'], self.instruments[name]['scale'])
+                if value is not None:
+                    matrices[name][row, item] = value
+
+        return matrices
+
+
+class UserScores:
+    """Running instrument scores for one user, updated as answers arrive"""
+
+    def __init__(self, scorer: InstrumentScorer):
+        self.scorer = scorer
+        self.values = {}
+        self.sums = {}
+        self.missing = {}
+
+        for name, spec in scorer.instruments.items():
+            self.values[name] = [None] * spec['n_items']
+            self.sums[name] = [0.0] * len(spec['score_names'])
+            self.missing[name] = [int(n) for n in spec['member'].sum(axis=0)]
+
+    def record(self, question_id: str, response: Any) -> Optional[str]:
+        """Record an answer; returns the instrument it updated, if any"""
+
+        location = self.scorer.locate(question_id)
+        if location is None:
+            return None
+
+        name, item = location
+        spec = self.scorer.instruments[name]
+        value = parse_item_value(response, spec['scale'])
+        if value is not None and spec['reverse'][item]:
+            value = spec['scale'][0] + spec['scale'][1] - value
+
+        old = self.values[name][item]
+        self.values[name][item] = value
+
+        for col in spec['memberships'][item]:
+            if old is not None:
+                self.sums[name][col] -= old
+                self.missing[name][col] += 1
+            if value is not None:
+                self.sums[name][col] += value
+                self.missing[name][col] -= 1
+
+        return name
+
+    def scores(self, instrument: str = None) -> Dict[str, Dict[str, Any]]:
+        """Current scores for answered instruments (or just one instrument)"""
+
+        names = [instrument] if instrument else list(self.scorer.instruments)
+        results = {}
+
+        for name in names:
+            answered = sum(v is not None for v in self.values[name])
+            if not answered:
+                continue
+
+            spec = self.scorer.instruments[name]
+            scores = {}
+            for col, score_name in enumerate(spec['score_names']):
+                if self.missing[name][col]:
+                    scores[score_name] = None
+                else:
+                    scores[score_name] = (self.sums[name][col] / float(spec['divisors'][col])
+                                          * spec['multiplier'])
+
+            if spec['total'] == 'subscales':
+                subscales = [scores[s] for s in spec['subscale_names']]
+                if None in subscales:
+                    scores['total'] = None
+                else:
+                    total = 0.0
+                    for subscale in subscales:
+                        total += subscale
+                    scores['total'] = total / len(subscales) * spec['total_multiplier']
+
+            # Bands come from the unrounded scores, as in score_matrix; only the output is rounded
+            results[name] = {
+                'answered_items': answered,
+                'total_items': spec['n_items'],
+                'scores': {score_name: None if score is None else round(score, 2)
+                           for score_name, score in scores.items()},
+                'severity': {
+                    score_name: self.scorer.severity(name, score_name, scores[score_name])
+                    for score_name in spec['cutoffs']
+                }
+            }
+
+        return results
+
+
+if __name__ == '__main__':
+    data_dir = Path('/Users/martinkawalski/ZOE/data')
+    scorer = InstrumentScorer()
+
+    # Score the simulated journeys
+    reports = sorted(data_dir.glob('journey_simulation_*.json'))
+    users = []
+    for report_file in reports:
+        with open(report_file, 'r') as f:
+            users.append(json.load(f)['user_responses'])
+
+    if users:
+        print(f"🧮 Scoring {len(users)} simulated journeys...")
+        results = scorer.score_cohort(scorer.response_matrices(users))
+        for instrument, result in results.items():
+            for score_name, score in result['scores'].items():
+                scored = int(np.count_nonzero(~np.isnan(score)))
+                print(f"   {instrument:14s} {score_name:22s} scored for {scored}/{len(users)} users")
+
+    # Batch throughput on a synthetic cohort
+    n_users = 1_000_000
+    rng = np.random.default_rng(42)
+    print(f"\n⚡ Scoring {n_users:,} synthetic patients per instrument...")
+    for instrument, spec in scorer.instruments.items():
+        low, high = spec['scale']
+        matrix = rng.integers(low, high + 1, size=(n_users, spec['n_items'])).astype(float)
+
+        start = time.perf_counter()
+        result = scorer.score_matrix(instrument, matrix)
+        elapsed = time.perf_counter() - start
+
+        print(f"   {instrument:14s} {elapsed * 1000:7.1f}ms "
+              f"({n_users / elapsed / 1e6:.1f}M patients/s)")
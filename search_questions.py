@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+ZOE Adaptive Onboarding - Question Bank Search Index
+Inverted index over QuestionnaireParser output for content tooling: keyword
+search with module/answer-type filters, and near-duplicate detection via
+character shingles. Sheets whose questions are unchanged are not re-indexed.
+"""
+
+import hashlib
+import json
+import math
+import re
+import sys
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Any, Iterable
+
+SHINGLE_SIZE = 3
+
+# Prefix completions of the last query token score at most this fraction of
+# an exact match, so 'sleep' ranks exact matches above 'sleeplessness'
+COMPLETION_WEIGHT = 0.5
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Trailing answer options, e.g. "(0-10)" or "(Yes/No)"; shared by whole
+# instruments, so they are left out of similarity
+OPTIONS_RE = re.compile(r'\s*\([^()]*\)\s*$')
+
+
+def normalize(text: str) -> str:
+    """Casefold and strip accents so 'Réveil' and 'reveil' match"""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(normalize(text))
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> List[str]:
+    """Character n-grams of the question wording (language independent)"""
+    words = ' '.join(tokenize(OPTIONS_RE.sub('', text)))
+    if len(words) <= size:
+        return [words] if words else []
+    return sorted({words[i:i + size] for i in range(len(words) - size + 1)})
+
+
+def sheet_fingerprint(questions: List[Dict]) -> str:
+    data = json.dumps(questions, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+class QuestionIndex:
+    def __init__(self):
+        # module (one per sheet) -> {'fingerprint', 'question_ids'}
+        self.sheets = {}
+        # question id -> {'question', 'tokens', 'shingles'}
+        self.documents = {}
+
+        self.postings = defaultdict(set)
+        self.shingle_postings = defaultdict(set)
+        self.by_module = defaultdict(set)
+        self.by_answer_type = defaultdict(set)
+        self._vocabulary = None
+
+    def _add(self, question: Dict, tokens: List[str], question_shingles: List[str]):
+        question_id = question['id']
+        self.documents[question_id] = {
+            'question': question,
+            'tokens': tokens,
+            'shingles': question_shingles
+        }
+
+        for token in set(tokens):
+            self.postings[token].add(question_id)
+        for shingle in question_shingles:
+            self.shingle_postings[shingle].add(question_id)
+        self.by_module[question['module']].add(question_id)
+        self.by_answer_type[question.get('answer_type')].add(question_id)
+
+    def _remove(self, question_id: str):
+        document = self.documents.pop(question_id)
+        question = document['question']
+
+        for index, keys in ((self.postings, set(document['tokens'])),
+                            (self.shingle_postings, document['shingles']),
+                            (self.by_module, [question['module']]),
+                            (self.by_answer_type, [question.get('answer_type')])):
+            for key in keys:
+                index[key].discard(question_id)
+                if not index[key]:
+                    del index[key]
+
+    def update_sheet(self, module: str, questions: List[Dict], fingerprint: str = None,
+                     tokenized: Dict[str, Dict] = None):
+        """Replace every question of one sheet (module) in the index"""
+
+        for question_id in self.sheets.get(module, {}).get('question_ids', []):
+            self._remove(question_id)
+
+        for question in questions:
+            cached = (tokenized or {}).get(question['id'])
+            if cached:
+                self._add(question, cached['tokens'], cached['shingles'])
+            else:
+                self._add(question, tokenize(question['text']), shingles(question['text']))
+
+        self.sheets[module] = {
+            'fingerprint': fingerprint or sheet_fingerprint(questions),
+            'question_ids': [q['id'] for q in questions]
+        }
+        self._vocabulary = None
+
+    def sync(self, questions: Iterable[Dict]) -> List[str]:
+        """
+        Bring the index in line with parsed questions (QuestionnaireParser
+        output). Only sheets whose content changed are re-indexed.
+        Returns the modules that were rebuilt.
+        """
+
+        by_sheet = defaultdict(list)
+        for question in questions:
+            by_sheet[question['module']].append(question)
+
+        rebuilt = []
+        for module in list(self.sheets):
+            if module not in by_sheet:
+                self.update_sheet(module, [])
+                del self.sheets[module]
+                rebuilt.append(module)
+
+        for module, sheet_questions in by_sheet.items():
+            fingerprint = sheet_fingerprint(sheet_questions)
+            if self.sheets.get(module, {}).get('fingerprint') != fingerprint:
+                self.update_sheet(module, sheet_questions, fingerprint)
+                rebuilt.append(module)
+
+        return rebuilt
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        """Vocabulary tokens starting with prefix (for search-as-you-type)"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+
+        matches = []
+        i = bisect_left(self._vocabulary, prefix)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(prefix):
+            matches.append(self._vocabulary[i])
+            i += 1
+        return matches
+
+    def _idf(self, token: str) -> float:
+        return math.log(1 + len(self.documents) / (1 + len(self.postings.get(token, ()))))
+
+    def search(self, query: str, module: str = None, answer_type: str = None,
+               limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Keyword search: every query token must match (the last one as a
+        prefix), ranked by summed IDF of the matched tokens. Completions of
+        the last token are down-weighted below an exact match.
+        """
+
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        candidates = None
+        matched_terms = []
+        for position, token in enumerate(tokens):
+            # term -> score it contributes for this query position
+            terms = {token: self._idf(token)}
+            if position == len(tokens) - 1:
+                exact_idf = self._idf(token) if token in self.postings else math.inf
+                for term in self._expand_prefix(token):
+                    if term != token:
+                        terms[term] = COMPLETION_WEIGHT * min(self._idf(term), exact_idf)
+
+            ids = set()
+            for term in terms:
+                ids |= self.postings.get(term, set())
+            candidates = ids if candidates is None else candidates & ids
+            matched_terms.append(terms)
+            if not candidates:
+                return []
+
+        if module is not None:
+            candidates &= self.by_module.get(module, set())
+        if answer_type is not None:
+            candidates &= self.by_answer_type.get(answer_type, set())
+
+        results = []
+        for question_id in candidates:
+            document_tokens = set(self.documents[question_id]['tokens'])
+            score = sum(max(term_score for term, term_score in terms.items() if term in document_tokens)
+                        for terms in matched_terms)
+            results.append({'score': round(score, 3), **self.documents[question_id]['question']})
+
+        results.sort(key=lambda r: (-r['score'], r['id']))
+        return results[:limit]
+
+    def similar_to(self, text: str, threshold: float = 0.7, exclude: str = None) -> List[Dict[str, Any]]:
+        """Questions whose shingle Jaccard similarity to text is at least threshold"""
+
+        query = set(shingles(text))
+        if not query:
+            return []
+
+        overlap = defaultdict(int)
+        for shingle in query:
+            for question_id in self.shingle_postings.get(shingle, ()):
+                overlap[question_id] += 1
+
+        results = []
+        for question_id, shared in overlap.items():
+            if question_id == exclude:
+                continue
+            size = len(self.documents[question_id]['shingles'])
+            similarity = shared / (len(query) + size - shared)
+            if similarity >= threshold:
+                results.append({'similarity': round(similarity, 3),
+                                **self.documents[question_id]['question']})
+
+        results.sort(key=lambda r: -r['similarity'])
+        return results
+
+    def near_duplicates(self, threshold: float = 0.7) -> List[Dict[str, Any]]:
+        """
+        All question pairs across the bank with shingle Jaccard >= threshold.
+        Uses prefix filtering: with shingles ordered rarest first, two sets
+        can only reach the threshold if their short prefixes share a shingle,
+        so common shingles never generate candidate pairs. Questions with
+        identical shingles (the same item in several sheets) are compared
+        once as a group.
+        """
+
+        members = defaultdict(list)
+        for question_id, document in self.documents.items():
+            if document['shingles']:
+                members[frozenset(document['shingles'])].append(question_id)
+
+        # Smaller sets first, so each candidate pair is checked once
+        groups = sorted(members, key=len)
+        rank = {shingle: (len(ids), shingle) for shingle, ids in self.shingle_postings.items()}
+        prefix_index = defaultdict(list)
+        similar = [(1.0, group, group) for group in range(len(groups)) if len(members[groups[group]]) > 1]
+
+        for group, shingle_set in enumerate(groups):
+            size = len(shingle_set)
+            prefix_length = size - math.ceil(threshold * size) + 1
+            min_size = threshold * size
+
+            candidates = set()
+            for shingle in sorted(shingle_set, key=rank.__getitem__)[:prefix_length]:
+                candidates.update(prefix_index[shingle])
+                prefix_index[shingle].append(group)
+
+            for other in candidates:
+                other_set = groups[other]
+                # Length filter: Jaccard can't reach threshold with sizes this far apart
+                if len(other_set) < min_size:
+                    continue
+                shared = len(shingle_set & other_set)
+                similarity = shared / (size + len(other_set) - shared)
+                if similarity >= threshold:
+                    similar.append((similarity, group, other))
+
+        pairs = []
+        for similarity, group, other in similar:
+            similarity = round(similarity, 3)
+            group_ids = members[groups[group]]
+            other_ids = members[groups[other]]
+            for i, question_id in enumerate(group_ids):
+                # Within a group, pair each question only with the ones after it
+                module = self.documents[question_id]['question']['module']
+                for other_id in (group_ids[i + 1:] if group == other else other_ids):
+                    other_module = self.documents[other_id]['question']['module']
+                    # Plain comparisons instead of sorted(): this loop runs once per output pair
+                    pairs.append({
+                        'similarity': similarity,
+                        'question_ids': [question_id, other_id] if question_id < other_id else [other_id, question_id],
+                        'modules': ([module] if module == other_module else
+                                    [module, other_module] if module < other_module else [other_module, module])
+                    })
+
+        pairs.sort(key=lambda p: (-p['similarity'], p['question_ids']))
+        return pairs
+
+    def save(self, index_file: str):
+        """Persist tokenized sheets so a later sync only re-indexes changed sheets"""
+
+        sheets = {
+            module: {
+                'fingerprint': sheet['fingerprint'],
+                'documents': [self.documents[question_id] for question_id in sheet['question_ids']]
+            }
+            for module, sheet in self.sheets.items()
+        }
+
+        with open(index_file, 'w', encoding='utf-8') as f:
+            json.dump({'shingle_size': SHINGLE_SIZE, 'sheets': sheets}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, index_file: str) -> 'QuestionIndex':
+        index = cls()
+        path = Path(index_file)
+        if not path.exists():
+            return index
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        # Shingles from a different shingle size can't be reused
+        if data.get('shingle_size') != SHINGLE_SIZE:
+            return index
+
+        for module, sheet in data['sheets'].items():
+            documents = sheet['documents']
+            index.update_sheet(module, [d['question'] for d in documents], sheet['fingerprint'],
+                               {d['question']['id']: d for d in documents})
+        return index
+
+
+if __name__ == '__main__':
+    data_dir = Path('/Users/martinkawalski/ZOE/data')
+    questions_file = data_dir / 'questions.json'
+    index_file = data_dir / 'question_index.json'
+
+    with open(questions_file, 'r') as f:
+        questions = json.load(f)
+
+    start = time.perf_counter()
+    index = QuestionIndex.load(str(index_file))
+    rebuilt = index.sync(questions)
+    index.save(str(index_file))
+    print(f"🔎 Indexed {len(index.documents)} questions in {(time.perf_counter() - start) * 1000:.1f}ms "
+          f"(rebuilt: {', '.join(rebuilt) if rebuilt else 'none'})")
+
+    if len(sys.argv) > 1:
+        # Keyword search: python3 search_questions.py <query>
+        query = ' '.join(sys.argv[1:])
+        for result in index.search(query):
+            print(f"   [{result['score']:5.2f}] {result['id']:18s} {result['module']:14s} {result['text'][:70]}")
+    else:
+        start = time.perf_counter()
+        pairs = index.near_duplicates()
+        elapsed = (time.perf_counter() - start) * 1000
+
+        print(f"\n🧬 Near-duplicate pairs (≥0.7 similarity, {elapsed:.1f}ms):")
+        for pair in pairs:
+            a, b = pair['question_ids']
+            print(f"   {pair['similarity']:.2f}  {a} ↔ {b}")
+            print(f"         {index.documents[a]['question']['text'][:70]}")
+            print(f"         {index.documents[b]['question']['text'][:70]}")